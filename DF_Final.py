@@ -1,10 +1,20 @@
 import os
+import sys
+import argparse
 import shutil
 import time
-import hashlib
-import pdfplumber
+import sqlite3
+import logging
+import logging.handlers
+import xxhash
+import tempfile
+import threading
+import queue
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import pymupdf as fitz
 from pdf2image import convert_from_path
 import pytesseract
+import numpy as np
 import pandas as pd
 from datetime import datetime
 
@@ -18,14 +28,49 @@ EXTRACTED_TEXT_FOLDER = os.path.join(BASE_FOLDER, "Main_Extracted_Text")
 EXCEPTION_FOLDER = os.path.join(BASE_FOLDER, "Exception_Folder")
 UNIQUE_INVOICES_FOLDER = os.path.join(BASE_FOLDER, "Unique_Invoices_Folder")
 DUPLICATES_INVOICES_FOLDER = os.path.join(BASE_FOLDER, "Duplicates_Invoices_Folder")
+# OCR text keyed by PDF content hash, so a re-sent scan is never OCR'd twice
+OCR_CACHE_FOLDER = os.path.join(BASE_FOLDER, "OCR_Cache")
 
 POPPLER_PATH = r"C:\Program Files\poppler-25.07.0\Library\bin"
 TESSERACT_PATH = r"C:\Program Files\Tesseract-OCR\tesseract.exe"
 pytesseract.pytesseract.tesseract_cmd = TESSERACT_PATH
 
+# Repository file hashes keyed by (path, mtime, size), reused across runs
+HASH_DB_PATH = os.path.join(BASE_FOLDER, "repo_hashes.sqlite")
+# Reading and hashing text files is I/O bound, so threads overlap disk latency
+HASH_WORKERS = 16
+# Buffer for copying PDFs when a hardlink is not possible
+COPY_BUFFER_SIZE = 4 * 1024 * 1024
 
-def log(msg):
-    print(f"[{time.strftime('%Y-%m-%d %H:%M:%S')}] {msg}")
+# --pipeline mode: bounded page queue between the Poppler and Tesseract stages
+PIPELINE_QUEUE_SIZE = 8
+RENDER_WORKERS = 2
+
+
+# Log records are buffered and written to stdout in blocks instead of one print per line
+LOG_BUFFER_CAPACITY = 1000
+
+logger = logging.getLogger("invoice_duplicate_detector")
+
+
+def setup_logging():
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(logging.Formatter("[%(asctime)s] %(message)s", datefmt="%Y-%m-%d %H:%M:%S"))
+    # Failures are logged at ERROR, which flushes the buffer right away
+    logger.addHandler(logging.handlers.MemoryHandler(capacity=LOG_BUFFER_CAPACITY, flushLevel=logging.ERROR,
+                                                     target=stream_handler))
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+
+def flush_logs():
+    for handler in logger.handlers:
+        handler.flush()
+
+
+def list_files_with_ext(folder, ext):
+    with os.scandir(folder) as it:
+        return [entry.name for entry in it if entry.is_file() and entry.name.lower().endswith(ext)]
 
 
 def ensure_folders():
@@ -35,25 +80,80 @@ def ensure_folders():
     os.makedirs(EXCEPTION_FOLDER, exist_ok=True)
     os.makedirs(UNIQUE_INVOICES_FOLDER, exist_ok=True)
     os.makedirs(DUPLICATES_INVOICES_FOLDER, exist_ok=True)
+    os.makedirs(OCR_CACHE_FOLDER, exist_ok=True)
+
+
+def fast_copy(src_path, dst_path):
+    if sys.platform != "win32":
+        # shutil already copies in-kernel here (sendfile / fcopyfile)
+        shutil.copy2(src_path, dst_path)
+        return
+    # On Windows shutil falls back to a 1 MiB read/write loop; large scans
+    # copy with far fewer syscalls through a bigger buffer
+    with open(src_path, 'rb') as src, open(dst_path, 'wb') as dst:
+        shutil.copyfileobj(src, dst, length=COPY_BUFFER_SIZE)
+    shutil.copystat(src_path, dst_path)
+
+
+def link_or_copy(src_path, dst_path):
+    # An existing target may be a hardlink to a source file from an earlier
+    # run; unlink it so the copy below can never write through into that file
+    if os.path.lexists(dst_path):
+        os.remove(dst_path)
+    # A hardlink is metadata-only; fall back to a real copy across volumes
+    # or on filesystems without link support
+    try:
+        os.link(src_path, dst_path)
+    except OSError:
+        fast_copy(src_path, dst_path)
 
 
 def copy_pdfs_to_main_folder(source_folder):
-    log(f"Copying files from {source_folder} to {MAIN_PDF_FOLDER}")
+    logger.info(f"Copying files from {source_folder} to {MAIN_PDF_FOLDER}")
     pdf_count = 0
     other_count = 0
+    byte_duplicate_count = 0
+    # Byte-identical files have the same size, so a PDF is only read and
+    # hashed once a second PDF of its size turns up; the rest are linked unread
+    unhashed_by_size = {}
+    hashes_by_size = {}
+
+    def find_byte_duplicate(src_path, filename):
+        size = os.stat(src_path).st_size
+        if size not in hashes_by_size:
+            if size not in unhashed_by_size:
+                unhashed_by_size[size] = (src_path, filename)
+                return None
+            first_path, first_name = unhashed_by_size.pop(size)
+            hashes_by_size[size] = {hash_file_bytes(first_path): first_name}
+        seen = hashes_by_size[size]
+        h = hash_file_bytes(src_path)
+        if h in seen:
+            return seen[h]
+        seen[h] = filename
+        return None
 
     try:
-        has_subfolders = any(os.path.isdir(os.path.join(source_folder, d)) for d in os.listdir(source_folder))
+        with os.scandir(source_folder) as it:
+            entries = list(it)
+        has_subfolders = any(entry.is_dir() for entry in entries)
 
         def process_file(src_path, filename):
-            nonlocal pdf_count, other_count
-            dst_folder = MAIN_PDF_FOLDER if filename.lower().endswith('.pdf') else EXCEPTION_FOLDER
-            shutil.copy2(src_path, os.path.join(dst_folder, filename))
-            if dst_folder == MAIN_PDF_FOLDER:
+            nonlocal pdf_count, other_count, byte_duplicate_count
+            if filename.lower().endswith('.pdf'):
+                # Byte-identical re-sends skip extraction and go straight to Duplicates
+                original = find_byte_duplicate(src_path, filename)
+                if original is not None:
+                    link_or_copy(src_path, os.path.join(DUPLICATES_INVOICES_FOLDER, filename))
+                    byte_duplicate_count += 1
+                    logger.info(f"📁 '{filename}' is byte-identical to '{original}', moved to Duplicates folder")
+                    return
+                link_or_copy(src_path, os.path.join(MAIN_PDF_FOLDER, filename))
                 pdf_count += 1
             else:
+                link_or_copy(src_path, os.path.join(EXCEPTION_FOLDER, filename))
                 other_count += 1
-                log(f"⚠️ Non-PDF file '{filename}' moved to Exception folder")
+                logger.warning(f"⚠️ Non-PDF file '{filename}' moved to Exception folder")
 
         if has_subfolders:
             for root, _, files in os.walk(source_folder):
@@ -61,30 +161,106 @@ def copy_pdfs_to_main_folder(source_folder):
                     full_path = os.path.join(root, f)
                     process_file(full_path, f)
         else:
-            for f in os.listdir(source_folder):
-                full_path = os.path.join(source_folder, f)
-                if os.path.isfile(full_path):
-                    process_file(full_path, f)
+            for entry in entries:
+                if entry.is_file():
+                    process_file(entry.path, entry.name)
 
-        log(f"✅ {pdf_count} PDFs copied to {MAIN_PDF_FOLDER}")
-        log(f"📦 {other_count} non-PDF files moved to {EXCEPTION_FOLDER}")
+        logger.info(f"✅ {pdf_count} PDFs copied to {MAIN_PDF_FOLDER}")
+        logger.info(f"🗂️ {byte_duplicate_count} byte-identical PDFs moved to {DUPLICATES_INVOICES_FOLDER}")
+        logger.info(f"📦 {other_count} non-PDF files moved to {EXCEPTION_FOLDER}")
     except Exception as e:
-        log(f"❌ Error copying files: {e}")
+        logger.error(f"❌ Error copying files: {e}")
 
 
-def extract_text_from_pdf(pdf_path):
+def extract_digital_text(pdf_path):
     try:
-        with pdfplumber.open(pdf_path) as pdf:
-            text = ''.join(page.extract_text() or '' for page in pdf.pages).strip()
+        with fitz.open(pdf_path) as doc:
+            if doc.page_count == 0:
+                return ""
+            # A first page with no text and no fonts means an image-only scan:
+            # go straight to OCR without reading the remaining pages
+            first_page = doc[0]
+            first_text = first_page.get_text("text")
+            if not first_text.strip() and not first_page.get_fonts():
+                return ""
+            text = (first_text + ''.join(doc[i].get_text() for i in range(1, doc.page_count))).strip()
             if len(text) >= 30:
-                return text, "pdfplumber"
+                return text
     except Exception:
         pass
+    return ""
+
+
+def raster_thread_count(workers):
+    # Poppler threads per rendering worker, so workers * threads stays near
+    # the core count instead of every worker starting cpu_count pdftocairo runs
+    return max(1, min(4, (os.cpu_count() or 1) // workers))
+
+
+def render_pages(pdf_path, thread_count=1):
+    # Pages are split across thread_count Poppler processes; pdftocairo is
+    # the faster renderer for grayscale output
+    return convert_from_path(pdf_path, dpi=200, poppler_path=POPPLER_PATH,
+                             grayscale=True, thread_count=thread_count,
+                             fmt='png', use_pdftocairo=True)
+
+
+def ocr_pages(pages):
+    # One Tesseract run over a list of page images instead of one per page
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        image_paths = []
+        for i, page in enumerate(pages):
+            image_path = os.path.join(tmp_dir, f"page_{i:04d}.png")
+            page.save(image_path)
+            image_paths.append(image_path)
+        list_path = os.path.join(tmp_dir, "images.txt")
+        with open(list_path, 'w', encoding='utf-8') as file:
+            file.write('\n'.join(image_paths) + '\n')
+        return pytesseract.image_to_string(list_path).strip()
+
+
+def ocr_cache_path(pdf_path):
+    return os.path.join(OCR_CACHE_FOLDER, hash_file_bytes(pdf_path) + ".txt")
+
 
+def read_ocr_cache(cache_path):
+    # A missing, undecodable or too-short entry is a miss, so the PDF is OCR'd
+    # again instead of being sent to the Exception folder
     try:
-        pages = convert_from_path(pdf_path, dpi=300, poppler_path=POPPLER_PATH)
-        text = ''.join(pytesseract.image_to_string(p).strip() for p in pages)
+        with open(cache_path, 'r', encoding='utf-8') as file:
+            text = file.read()
+    except (OSError, ValueError):
+        return None
+    return text if len(text) >= 30 else None
+
+
+def write_ocr_cache(cache_path, text):
+    # Write to a temporary file and rename it into place, so an interrupted
+    # run never leaves a partial entry under the final name
+    tmp_path = None
+    try:
+        fd, tmp_path = tempfile.mkstemp(dir=OCR_CACHE_FOLDER, suffix=".tmp")
+        with os.fdopen(fd, 'w', encoding='utf-8') as file:
+            file.write(text)
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        if tmp_path and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def extract_text_from_pdf(pdf_path, raster_threads=1):
+    text = extract_digital_text(pdf_path)
+    if text:
+        return text, "pymupdf"
+
+    try:
+        cache_path = ocr_cache_path(pdf_path)
+        text = read_ocr_cache(cache_path)
+        if text:
+            return text, "ocr cache"
+        text = ocr_pages(render_pages(pdf_path, raster_threads))
         if len(text) >= 30:
+            write_ocr_cache(cache_path, text)
             return text, "ocr"
     except Exception:
         pass
@@ -92,137 +268,345 @@ def extract_text_from_pdf(pdf_path):
     return "", None
 
 
-def extract_texts():
-    log("Starting text extraction...")
-    count_extracted = 0
-    count_exception = 0
-    start = time.time()
+def _init_ocr_worker():
+    # One Tesseract thread per pool worker: the pool already uses every core
+    os.environ["OMP_THREAD_LIMIT"] = "1"
 
-    for f in os.listdir(MAIN_PDF_FOLDER):
-        if f.lower().endswith(".pdf"):
-            pdf_path = os.path.join(MAIN_PDF_FOLDER, f)
-            text, method = extract_text_from_pdf(pdf_path)
 
-            if text:
-                try:
-                    txt_path = os.path.join(EXTRACTED_TEXT_FOLDER, os.path.splitext(f)[0] + ".txt")
-                    with open(txt_path, 'w', encoding='utf-8') as file:
-                        file.write(text)
-                    count_extracted += 1
-                    log(f"✅ Extracted text from '{f}' using {method}")
-                except Exception as e:
-                    log(f"❌ Failed to save text for '{f}': {e}")
-            else:
-                try:
-                    shutil.move(pdf_path, os.path.join(EXCEPTION_FOLDER, f))
-                    count_exception += 1
-                    log(f"🛑 Extraction failed. Moved '{f}' to Exception folder")
-                except Exception as e:
-                    log(f"❌ Failed to move '{f}' to Exception folder: {e}")
+def ocr_worker_count():
+    cores = os.cpu_count() or 1
+    # Tesseract spins up its own OpenMP threads unless OMP_THREAD_LIMIT=1,
+    # so leave room for them instead of oversubscribing the CPU.
+    if os.environ.get("OMP_THREAD_LIMIT") == "1":
+        return cores
+    return max(1, cores // 4)
 
-    log(f"Extraction done. {count_extracted} succeeded, {count_exception} exceptions")
-    log(f"⏱️ Took {time.time() - start:.2f} seconds")
 
+def _extract_one(pdf_path, raster_threads):
+    text, method = extract_text_from_pdf(pdf_path, raster_threads)
+    return os.path.basename(pdf_path), text, method
 
-def sha256_hash(text):
-    normalized = ''.join(text.lower().split())
-    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
 
+def _pooled_extraction(pdf_paths):
+    # Workers run single-threaded Tesseract, so one per core
+    workers = os.cpu_count() or 1
+    raster_threads = raster_thread_count(workers)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_ocr_worker) as executor:
+        yield from executor.map(_extract_one, pdf_paths, [raster_threads] * len(pdf_paths), chunksize=4)
 
-def deduplicate_text_files():
-    log("Starting deduplication...")
-    start = time.time()
-    files = [f for f in os.listdir(EXTRACTED_TEXT_FOLDER) if f.lower().endswith('.txt')]
-    seen_hashes = {}
-    removed_count = 0
 
-    for f in files:
-        txt_path = os.path.join(EXTRACTED_TEXT_FOLDER, f)
+def _put_unless_aborted(q, item, abort):
+    # Bounded puts wake up regularly, so a thread never outlives an abandoned pipeline
+    while not abort.is_set():
         try:
-            with open(txt_path, 'r', encoding='utf-8') as file:
-                content = file.read()
-            h = sha256_hash(content)
+            q.put(item, timeout=0.2)
+            return True
+        except queue.Full:
+            pass
+    return False
 
-            if h in seen_hashes:
-                os.remove(txt_path)
-                removed_count += 1
-                log(f"🗑️ Removed duplicate text file '{f}' (duplicate of '{seen_hashes[h]}')")
 
-                # Move corresponding PDF to duplicates folder
-                pdf_name = os.path.splitext(f)[0] + ".pdf"
-                pdf_path = os.path.join(MAIN_PDF_FOLDER, pdf_name)
-                dst_path = os.path.join(DUPLICATES_INVOICES_FOLDER, pdf_name)
+def _get_unless_aborted(q, abort):
+    while not abort.is_set():
+        try:
+            return q.get(timeout=0.2)
+        except queue.Empty:
+            pass
+    return None
+
+
+def _pipelined_extraction(pdf_paths):
+    # Renderer threads run the text-layer check and Poppler, OCR threads run
+    # Tesseract on single pages, and this generator reassembles each PDF
+    page_queue = queue.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+    result_queue = queue.Queue()
+    # Set when the caller stops iterating, so the worker threads wind down
+    abort = threading.Event()
+    ocr_thread_count = ocr_worker_count()
+    raster_threads = raster_thread_count(RENDER_WORKERS)
+
+    def render(pdf_path):
+        # Posts exactly one "done" or "pages" message per PDF, whatever fails,
+        # so the generator below always sees every PDF finish
+        f = os.path.basename(pdf_path)
+        try:
+            text = extract_digital_text(pdf_path)
+            if text:
+                result_queue.put(("done", f, text, "pymupdf"))
+                return
+            cache_path = ocr_cache_path(pdf_path)
+            text = read_ocr_cache(cache_path)
+            if text:
+                result_queue.put(("done", f, text, "ocr cache"))
+                return
+            pages = render_pages(pdf_path, raster_threads)
+        except Exception:
+            result_queue.put(("done", f, "", None))
+            return
+        result_queue.put(("pages", f, len(pages), cache_path))
+        for i, page in enumerate(pages):
+            if not _put_unless_aborted(page_queue, (f, i, page), abort):
+                return
+
+    def ocr():
+        while True:
+            item = _get_unless_aborted(page_queue, abort)
+            if item is None:
+                return
+            f, i, page = item
+            try:
+                text = pytesseract.image_to_string(page).strip()
+            except Exception:
+                text = ""
+            result_queue.put(("page", f, i, text))
 
-                if os.path.exists(pdf_path):
-                    shutil.move(pdf_path, dst_path)
-                    log(f"📁 Moved corresponding duplicate PDF '{pdf_name}' to Duplicates folder")
+    def feed():
+        try:
+            with ThreadPoolExecutor(max_workers=RENDER_WORKERS) as renderers:
+                for _ in renderers.map(render, pdf_paths):
+                    if abort.is_set():
+                        break
+        finally:
+            for _ in range(ocr_thread_count):
+                _put_unless_aborted(page_queue, None, abort)
+
+    ocr_threads = [threading.Thread(target=ocr, daemon=True) for _ in range(ocr_thread_count)]
+    for t in ocr_threads:
+        t.start()
+    threading.Thread(target=feed, daemon=True).start()
+
+    remaining = len(pdf_paths)
+    expected_pages = {}
+    page_texts = {}
+    cache_paths = {}
+    try:
+        while remaining:
+            message = result_queue.get()
+            kind, f = message[0], message[1]
+            if kind == "done":
+                remaining -= 1
+                yield f, message[2], message[3]
+                continue
+            if kind == "pages":
+                expected_pages[f] = message[2]
+                cache_paths[f] = message[3]
+                page_texts[f] = {}
             else:
-                seen_hashes[h] = f
-        except Exception as e:
-            log(f"❌ Error during deduplication of '{f}': {e}")
-
-    log(f"Deduplication done. Removed {removed_count} duplicates.")
-    log(f"⏱️ Took {time.time() - start:.2f} seconds")
+                page_texts[f][message[2]] = message[3]
+            if len(page_texts[f]) == expected_pages[f]:
+                texts = page_texts.pop(f)
+                text = ''.join(texts[i] for i in range(expected_pages.pop(f)))
+                cache_path = cache_paths.pop(f)
+                remaining -= 1
+                if len(text) >= 30:
+                    write_ocr_cache(cache_path, text)
+                    yield f, text, "ocr"
+                else:
+                    yield f, "", None
+
+        for t in ocr_threads:
+            t.join()
+    finally:
+        abort.set()
+
+
+def extract_texts(pipeline=False):
+    logger.info("Starting text extraction...")
+    count_extracted = 0
+    count_exception = 0
+    start = time.time()
 
+    pdf_paths = [os.path.join(MAIN_PDF_FOLDER, f) for f in list_files_with_ext(MAIN_PDF_FOLDER, ".pdf")]
+    results = _pipelined_extraction(pdf_paths) if pipeline else _pooled_extraction(pdf_paths)
 
-def cross_compare_with_repository(repository_folder):
-    log(f"Cross-comparing with repository: {repository_folder}")
-    start = time.time()
-    repo_hashes = set()
+    # Workers only extract; writes and moves stay in the main process
+    for f, text, method in results:
+        pdf_path = os.path.join(MAIN_PDF_FOLDER, f)
 
-    for f in os.listdir(repository_folder):
-        if f.lower().endswith(".txt"):
+        if text:
             try:
-                with open(os.path.join(repository_folder, f), 'r', encoding='utf-8') as file:
-                    repo_hashes.add(sha256_hash(file.read()))
+                txt_path = os.path.join(EXTRACTED_TEXT_FOLDER, os.path.splitext(f)[0] + ".txt")
+                with open(txt_path, 'w', encoding='utf-8') as file:
+                    file.write(text)
+                count_extracted += 1
+                logger.info(f"✅ Extracted text from '{f}' using {method}")
             except Exception as e:
-                log(f"❌ Could not read repo file '{f}': {e}")
+                logger.error(f"❌ Failed to save text for '{f}': {e}")
+        else:
+            try:
+                os.replace(pdf_path, os.path.join(EXCEPTION_FOLDER, f))
+                count_exception += 1
+                logger.warning(f"🛑 Extraction failed. Moved '{f}' to Exception folder")
+            except Exception as e:
+                logger.error(f"❌ Failed to move '{f}' to Exception folder: {e}")
+
+    logger.info(f"Extraction done. {count_extracted} succeeded, {count_exception} exceptions")
+    logger.info(f"⏱️ Took {time.time() - start:.2f} seconds")
+
+
+WHITESPACE_BYTES = b' \t\n\r\v\f'
+HASH_CHUNK_SIZE = 1 << 16
+# Stored in the hash DB: cached digests are only valid for this hash and normalization
+HASH_FINGERPRINT = f"xxh3-128:{WHITESPACE_BYTES.hex()}"
+
+
+def hash_file(path):
+    # Lowercasing and whitespace removal are per byte, so they can be applied
+    # chunk by chunk while memory stays bounded by HASH_CHUNK_SIZE
+    h = xxhash.xxh3_128()
+    with open(path, 'rb', buffering=0) as file:
+        while chunk := file.read(HASH_CHUNK_SIZE):
+            h.update(chunk.lower().translate(None, WHITESPACE_BYTES))
+    return h.hexdigest()
+
+
+def hash_file_bytes(path):
+    h = xxhash.xxh3_128()
+    with open(path, 'rb', buffering=0) as file:
+        while chunk := file.read(HASH_CHUNK_SIZE):
+            h.update(chunk)
+    return h.hexdigest()
+
 
-    extracted_files = [f for f in os.listdir(EXTRACTED_TEXT_FOLDER) if f.lower().endswith('.txt')]
+def open_hash_db():
+    db = sqlite3.connect(HASH_DB_PATH)
+    db.execute("CREATE TABLE IF NOT EXISTS hashes (path TEXT PRIMARY KEY, mtime REAL, size INT, hash TEXT)")
+    db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+    row = db.execute("SELECT value FROM meta WHERE key = 'fingerprint'").fetchone()
+    if row is None or row[0] != HASH_FINGERPRINT:
+        # Digests from another hash or normalization never match: start over
+        with db:
+            db.execute("DELETE FROM hashes")
+            db.execute("INSERT OR REPLACE INTO meta VALUES ('fingerprint', ?)", (HASH_FINGERPRINT,))
+    return db
+
+
+def load_repository_hashes(repository_folder):
+    logger.info(f"Loading repository hashes: {repository_folder}")
+    start = time.time()
+    cached_hashes = []
+    stale_files = []
+    stale_rows = []
+    present = set()
+
+    db = open_hash_db()
+    try:
+        cached = {row[0]: row[1:] for row in db.execute("SELECT path, mtime, size, hash FROM hashes")}
+
+        with os.scandir(repository_folder) as it:
+            for entry in it:
+                if entry.is_file() and entry.name.lower().endswith(".txt"):
+                    repo_path = os.path.abspath(entry.path)
+                    try:
+                        info = entry.stat()
+                        row = cached.get(repo_path)
+                        if row and row[0] == info.st_mtime and row[1] == info.st_size:
+                            cached_hashes.append(row[2])
+                        else:
+                            stale_files.append((entry.name, repo_path, info))
+                        present.add(repo_path)
+                    except Exception as e:
+                        logger.error(f"❌ Could not read repo file '{entry.name}': {e}")
+
+        # New or changed since the last run: rehash and refresh the cache
+        with ThreadPoolExecutor(max_workers=HASH_WORKERS) as executor:
+            futures = [executor.submit(hash_file, repo_path) for _, repo_path, _ in stale_files]
+            for (f, repo_path, info), future in zip(stale_files, futures):
+                try:
+                    h = future.result()
+                except Exception as e:
+                    logger.error(f"❌ Could not read repo file '{f}': {e}")
+                    present.discard(repo_path)
+                    continue
+                stale_rows.append((repo_path, info.st_mtime, info.st_size, h))
+
+        with db:
+            db.executemany("INSERT OR REPLACE INTO hashes VALUES (?, ?, ?, ?)", stale_rows)
+            # Forget files that were removed from this repository folder
+            folder = os.path.abspath(repository_folder)
+            gone = [(path,) for path in cached if os.path.dirname(path) == folder and path not in present]
+            db.executemany("DELETE FROM hashes WHERE path = ?", gone)
+    finally:
+        db.close()
+
+    # Build the lookup set in bulk rather than one .add() call per file
+    repo_hashes = set(cached_hashes)
+    repo_hashes.update(row[3] for row in stale_rows)
+    logger.info(f"♻️ Reused {len(cached_hashes)} cached repository hashes, hashed {len(stale_rows)} new or changed files")
+    logger.info(f"⏱️ Took {time.time() - start:.2f} seconds")
+    return repo_hashes
+
+
+def classify_extracted(repo_hashes):
+    # Each extracted text is read and hashed once, then sorted into
+    # intra-batch duplicate, repository duplicate or unique
+    logger.info("Classifying extracted texts against this batch and the repository...")
+    start = time.time()
+    extracted_files = list_files_with_ext(EXTRACTED_TEXT_FOLDER, '.txt')
+    # One listing of Main_Invoices_Folder instead of an exists() check per text file
+    with os.scandir(MAIN_PDF_FOLDER) as it:
+        pdfs_present = {entry.name for entry in it if entry.is_file()}
+    seen_hashes = {}
     count_unique = 0
-    count_duplicates = 0
+    count_batch_duplicates = 0
+    count_repo_duplicates = 0
 
-    for f in extracted_files:
+    with ThreadPoolExecutor(max_workers=HASH_WORKERS) as executor:
+        hash_futures = [executor.submit(hash_file, os.path.join(EXTRACTED_TEXT_FOLDER, f))
+                        for f in extracted_files]
+
+    for f, future in zip(extracted_files, hash_futures):
         txt_path = os.path.join(EXTRACTED_TEXT_FOLDER, f)
         try:
-            with open(txt_path, 'r', encoding='utf-8') as file:
-                content = file.read()
-            h = sha256_hash(content)
+            h = future.result()
 
             pdf_name = os.path.splitext(f)[0] + ".pdf"
             pdf_path = os.path.join(MAIN_PDF_FOLDER, pdf_name)
 
-            if h in repo_hashes:
-                # Duplicate
-                if os.path.exists(pdf_path):
-                    shutil.move(pdf_path, os.path.join(DUPLICATES_INVOICES_FOLDER, pdf_name))
+            if h in seen_hashes:
+                # Duplicate within this batch
                 os.remove(txt_path)
-                count_duplicates += 1
-                log(f"🗂️ Moved duplicate PDF '{pdf_name}' to Duplicates and deleted text")
+                count_batch_duplicates += 1
+                logger.info(f"🗑️ Removed duplicate text file '{f}' (duplicate of '{seen_hashes[h]}')")
+                if pdf_name in pdfs_present:
+                    os.replace(pdf_path, os.path.join(DUPLICATES_INVOICES_FOLDER, pdf_name))
+                    pdfs_present.discard(pdf_name)
+                    logger.info(f"📁 Moved corresponding duplicate PDF '{pdf_name}' to Duplicates folder")
+            elif h in repo_hashes:
+                # Duplicate of a repository invoice
+                if pdf_name in pdfs_present:
+                    os.replace(pdf_path, os.path.join(DUPLICATES_INVOICES_FOLDER, pdf_name))
+                    pdfs_present.discard(pdf_name)
+                os.remove(txt_path)
+                count_repo_duplicates += 1
+                logger.info(f"🗂️ Moved duplicate PDF '{pdf_name}' to Duplicates and deleted text")
             else:
                 # Unique
-                if os.path.exists(pdf_path):
-                    shutil.move(pdf_path, os.path.join(UNIQUE_INVOICES_FOLDER, pdf_name))
+                seen_hashes[h] = f
+                if pdf_name in pdfs_present:
+                    os.replace(pdf_path, os.path.join(UNIQUE_INVOICES_FOLDER, pdf_name))
+                    pdfs_present.discard(pdf_name)
                     count_unique += 1
-                    log(f"✅ Moved unique PDF '{pdf_name}' to Unique folder")
+                    logger.info(f"✅ Moved unique PDF '{pdf_name}' to Unique folder")
         except Exception as e:
-            log(f"❌ Error comparing file '{f}': {e}")
+            logger.error(f"❌ Error classifying file '{f}': {e}")
 
-   
-    for f in os.listdir(EXCEPTION_FOLDER):
-        if f.lower().endswith('.pdf'):
-            try:
-                shutil.copy2(os.path.join(EXCEPTION_FOLDER, f), os.path.join(UNIQUE_INVOICES_FOLDER, f))
-                log(f"📋 Copied exception PDF '{f}' to Unique folder for inspection")
-            except Exception as e:
-                log(f"❌ Could not copy exception PDF '{f}': {e}")
+    logger.info(f"Classification complete. Unique: {count_unique}, Batch duplicates: {count_batch_duplicates}, "
+                f"Repository duplicates: {count_repo_duplicates}")
+    logger.info(f"⏱️ Took {time.time() - start:.2f} seconds")
 
-    log(f"Cross-comparison complete. Unique: {count_unique}, Duplicates: {count_duplicates}")
-    log(f"⏱️ Took {time.time() - start:.2f} seconds")
+
+def copy_exceptions_to_unique():
+    for f in list_files_with_ext(EXCEPTION_FOLDER, '.pdf'):
+        try:
+            link_or_copy(os.path.join(EXCEPTION_FOLDER, f), os.path.join(UNIQUE_INVOICES_FOLDER, f))
+            logger.info(f"📋 Copied exception PDF '{f}' to Unique folder for inspection")
+        except Exception as e:
+            logger.error(f"❌ Could not copy exception PDF '{f}': {e}")
 
 
 def update_repository(repository_folder):
-    log(f"Updating repository at '{repository_folder}' with renaming...")
+    logger.info(f"Updating repository at '{repository_folder}' with renaming...")
     start = time.time()
 
     now = datetime.now()
@@ -232,61 +616,75 @@ def update_repository(repository_folder):
 
     moved_count = 0
 
-    for f in os.listdir(EXTRACTED_TEXT_FOLDER):
-        if f.lower().endswith(".txt"):
-            src_txt_path = os.path.join(EXTRACTED_TEXT_FOLDER, f)
+    # Compose base new filename; conflicts are resolved against a single
+    # listing of the repository instead of probing the disk per attempt
+    base_name = f"INVC_{date_str}_{time_str}_{month_year_str}.txt"
+    with os.scandir(repository_folder) as it:
+        existing_names = {entry.name for entry in it}
+    count = 1
 
-            # Compose base new filename
-            base_name = f"INVC_{date_str}_{time_str}_{month_year_str}.txt"
-            new_name = base_name
-            count = 1
+    for f in list_files_with_ext(EXTRACTED_TEXT_FOLDER, ".txt"):
+        src_txt_path = os.path.join(EXTRACTED_TEXT_FOLDER, f)
 
-            # Check for filename conflicts in repository and increment suffix if needed
-            while os.path.exists(os.path.join(repository_folder, new_name)):
-                new_name = base_name.replace(".txt", f"_{count}.txt")
-                count += 1
+        # Increment suffix until the name is free; count only moves on once a
+        # file has actually taken a name, so a failed move leaves no gap
+        new_name = base_name
+        next_count = count
+        while new_name in existing_names:
+            new_name = base_name.replace(".txt", f"_{next_count}.txt")
+            next_count += 1
 
-            dst_txt_path = os.path.join(repository_folder, new_name)
+        dst_txt_path = os.path.join(repository_folder, new_name)
 
+        try:
             try:
+                os.replace(src_txt_path, dst_txt_path)
+            except OSError:
+                # Repository on another volume
                 shutil.move(src_txt_path, dst_txt_path)
-                log(f"✅ Moved and renamed '{f}' to '{new_name}'")
-                moved_count += 1
-            except Exception as e:
-                log(f"❌ Failed to move and rename '{f}': {e}")
+            existing_names.add(new_name)
+            count = next_count
+            logger.info(f"✅ Moved and renamed '{f}' to '{new_name}'")
+            moved_count += 1
+        except Exception as e:
+            logger.error(f"❌ Failed to move and rename '{f}': {e}")
 
-    log(f"✅ Moved and renamed {moved_count} unique text files to repository")
-    log(f"⏱️ Took {time.time() - start:.2f} seconds")
+    logger.info(f"✅ Moved and renamed {moved_count} unique text files to repository")
+    logger.info(f"⏱️ Took {time.time() - start:.2f} seconds")
 
 
 def cleanup_main_pdf_folder():
-    leftover_files = [f for f in os.listdir(MAIN_PDF_FOLDER) if f.lower().endswith(".pdf")]
+    leftover_files = list_files_with_ext(MAIN_PDF_FOLDER, ".pdf")
     if not leftover_files:
-        log("✅ No leftover PDFs in MAIN_PDF_FOLDER")
+        logger.info("✅ No leftover PDFs in MAIN_PDF_FOLDER")
         return
-    log("⚠️ Cleaning up leftover PDFs in MAIN_PDF_FOLDER...")
+    logger.warning("⚠️ Cleaning up leftover PDFs in MAIN_PDF_FOLDER...")
     for f in leftover_files:
         try:
-            shutil.move(os.path.join(MAIN_PDF_FOLDER, f), os.path.join(EXCEPTION_FOLDER, f))
-            log(f"📦 Moved leftover PDF '{f}' to Exception folder")
+            os.replace(os.path.join(MAIN_PDF_FOLDER, f), os.path.join(EXCEPTION_FOLDER, f))
+            logger.info(f"📦 Moved leftover PDF '{f}' to Exception folder")
         except Exception as e:
-            log(f"❌ Failed to move leftover PDF '{f}': {e}")
+            logger.error(f"❌ Failed to move leftover PDF '{f}': {e}")
 
 
 # ===Functions to get pandas DataFrames of duplicates and unique invoices ===
 
 def list_files_as_dataframe(folder_path):
-    files = []
-    for f in os.listdir(folder_path):
-        full_path = os.path.join(folder_path, f)
-        if os.path.isfile(full_path):
-            info = os.stat(full_path)
-            files.append({
-                "Filename": f,
-                "Size_Bytes": info.st_size,
-                "Modified_Time": time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(info.st_mtime))
-            })
-    df = pd.DataFrame(files)
+    names, sizes, mtimes = [], [], []
+    with os.scandir(folder_path) as it:
+        for entry in it:
+            if entry.is_file():
+                info = entry.stat()
+                names.append(entry.name)
+                sizes.append(info.st_size)
+                mtimes.append(info.st_mtime)
+    # Local wall-clock times, to the second, as one datetime64 column
+    modified = np.array([datetime.fromtimestamp(int(t)) for t in mtimes], dtype='datetime64[s]')
+    df = pd.DataFrame({
+        "Filename": names,
+        "Size_Bytes": np.array(sizes, dtype=np.int64),
+        "Modified_Time": modified,
+    })
     return df
 
 
@@ -299,21 +697,30 @@ def get_unique_invoices_dataframe():
 
 
 def main():
-    log(f"Invoice Duplicate Detector - Version {VERSION}")
+    parser = argparse.ArgumentParser(description="Invoice Duplicate Detector")
+    parser.add_argument("--pipeline", action="store_true",
+                        help="overlap page rendering and OCR with a producer/consumer pipeline")
+    args = parser.parse_args()
+
+    setup_logging()
+    logger.info(f"Invoice Duplicate Detector - Version {VERSION}")
     ensure_folders()
     total_start = time.time()
+    flush_logs()
 
     source_folder = input("Enter the source folder containing PDFs or subfolders: ").strip()
     repository_folder = input("Enter the repository text folder path: ").strip()
 
     copy_pdfs_to_main_folder(source_folder)
-    extract_texts()
-    deduplicate_text_files()
-    cross_compare_with_repository(repository_folder)
+    extract_texts(pipeline=args.pipeline)
+    repo_hashes = load_repository_hashes(repository_folder)
+    classify_extracted(repo_hashes)
+    copy_exceptions_to_unique()
     update_repository(repository_folder)
     cleanup_main_pdf_folder()
 
-    log(f"🎉 All tasks completed in {time.time() - total_start:.2f} seconds.")
+    logger.info(f"🎉 All tasks completed in {time.time() - total_start:.2f} seconds.")
+    flush_logs()
 
     # Generate and print DataFrames for frontend or review
     df_duplicates = get_duplicate_invoices_dataframe()
@@ -4,7 +4,8 @@ Invoice Duplicate Detector - PyQt5 Version
 Save as: invoice_duplicate_gui_pyqt.py
 
 Before running:
- - Install dependencies: pip install PyQt5 pdfplumber pdf2image pytesseract pandas pillow
+ - Install dependencies: pip install PyQt5 pdfplumber pdf2image pandas pillow
+   (optional: pip install blake3 for faster duplicate fingerprints)
  - Ensure POPPLER_PATH and TESSERACT_PATH are set correctly below, or set them from the GUI.
 
 This script provides a modern PyQt5 interface for invoice duplicate detection.
@@ -13,21 +14,31 @@ import os
 import shutil
 import time
 import hashlib
+import sqlite3
 import pdfplumber
 from pdf2image import convert_from_path
-import pytesseract
+import numpy as np
 import pandas as pd
 from datetime import datetime
 import threading
 import queue
 import sys
+import subprocess
+import tempfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
+try:
+    import fcntl  # POSIX only, used for reflink copies
+except ImportError:
+    fcntl = None
 
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
                              QHBoxLayout, QPushButton, QLabel, QLineEdit, 
                              QFileDialog, QMessageBox, QTextEdit, QTableWidget,
                              QTableWidgetItem, QGroupBox, QGridLayout, QSplitter)
 from PyQt5.QtCore import Qt, QTimer, pyqtSignal, QObject
-from PyQt5.QtGui import QFont
+from PyQt5.QtGui import QFont, QTextCursor
 from PyQt5.QtWidgets import QDesktopWidget
 
 # ----------------- CONFIG (edit defaults if needed) -----------------
@@ -39,27 +50,36 @@ BASE_FOLDER = r"D:\Invoice_Duplicate_MainFolder_test"
 # Default external tool paths (edit if installed in different location)
 POPPLER_PATH = r"C:\Program Files\poppler-25.07.0\Library\bin"
 TESSERACT_PATH = r"C:\Program Files\Tesseract-OCR\tesseract.exe"
-pytesseract.pytesseract.tesseract_cmd = TESSERACT_PATH
 
 # -------------------------------------------------------------------
 
 # ----------------- Helper: threaded-safe logger to GUI -----------------
+# Oldest console lines are dropped past this, so appends and repaints stay cheap
+MAX_LOG_LINES = 5000
+
 class LogSignals(QObject):
     log_signal = pyqtSignal(str)
 
 class GUI_Logger:
     def __init__(self, text_widget: QTextEdit):
         self.text_widget = text_widget
+        self.text_widget.document().setMaximumBlockCount(MAX_LOG_LINES)
         self.queue = queue.Queue()
+        # (second, formatted) of the last timestamp: strftime runs once per second, not per line
+        self._last_ts = (None, "")
         self.signals = LogSignals()
         self.signals.log_signal.connect(self._append_to_widget)
         self._running = True
         self._start_timer()
 
     def log(self, msg):
-        ts = time.strftime('%Y-%m-%d %H:%M:%S')
-        line = f"[{ts}] {msg}"
-        self.queue.put(line)
+        now = int(time.time())
+        second, ts = self._last_ts
+        if now != second:
+            ts = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(now))
+            # One tuple assignment, so concurrent callers never see a torn pair
+            self._last_ts = (now, ts)
+        self.queue.put(f"[{ts}] {msg}")
 
     def _start_timer(self):
         self.timer = QTimer()
@@ -67,15 +87,23 @@ class GUI_Logger:
         self.timer.start(200)
 
     def _periodic_flush(self):
+        # One signal and one widget append per tick, however many lines queued up
+        lines = []
         try:
             while True:
-                line = self.queue.get_nowait()
-                self.signals.log_signal.emit(line)
+                lines.append(self.queue.get_nowait())
         except queue.Empty:
             pass
+        if lines:
+            self.signals.log_signal.emit("\n".join(lines))
 
     def _append_to_widget(self, msg):
-        self.text_widget.append(msg)
+        # Insert as plain text: append() guesses rich text from the first line,
+        # so one '<' in a batch could render the whole block as HTML
+        document = self.text_widget.document()
+        cursor = QTextCursor(document)
+        cursor.movePosition(QTextCursor.End)
+        cursor.insertText(msg if document.isEmpty() else "\n" + msg)
         self.text_widget.verticalScrollBar().setValue(
             self.text_widget.verticalScrollBar().maximum()
         )
@@ -96,9 +124,140 @@ class StdoutRedirector:
         pass
 
 # ----------------- Core processing functions -----------------
-def sha256_hash(text):
-    normalized = ''.join(text.lower().split())
-    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+# Dedup normalization on UTF-8 bytes: lowercase ASCII and drop ASCII whitespace.
+# Non-ASCII bytes are left alone so multi-byte characters are never split.
+# The whitespace set is DF_Final.py's WHITESPACE_BYTES, so both tools normalize alike
+_TRANS = bytes(range(256)).lower()
+_DEL = b' \t\n\r\v\f'
+HASH_CHUNK_SIZE = 65536
+
+# Dedup only needs a low-collision fingerprint, not a cryptographic hash:
+# use SIMD BLAKE3 when the optional package is installed, SHA-256 otherwise
+try:
+    from blake3 import blake3 as _hasher
+    FINGERPRINT_NAME = "blake3-128"
+except ImportError:
+    _hasher = hashlib.sha256
+    FINGERPRINT_NAME = "sha256-128"
+# 128 bits is plenty against collisions and halves the digests kept in sets and the repo index
+FINGERPRINT_SIZE = 16
+
+def content_fingerprint_bytes(chunk_iter):
+    h = _hasher()
+    for chunk in chunk_iter:
+        h.update(chunk.translate(_TRANS, _DEL))
+    return h.digest()[:FINGERPRINT_SIZE]
+
+def content_fingerprint(data):
+    # UTF-8 bytes already in memory: one translate pass, no chunk loop
+    return _hasher(data.translate(_TRANS, _DEL)).digest()[:FINGERPRINT_SIZE]
+
+def content_fingerprint_file(path):
+    with open(path, 'rb') as file:
+        return content_fingerprint_bytes(iter(lambda: file.read(HASH_CHUNK_SIZE), b''))
+
+def _init_worker():
+    # One Tesseract thread per worker: parallelism comes from the pool, and
+    # Tesseract's own OpenMP threading scales poorly
+    os.environ["OMP_THREAD_LIMIT"] = "1"
+
+def extract_digital_text(pdf_path):
+    # Module-level so it can be pickled into ProcessPoolExecutor workers.
+    # Returns UTF-8 bytes, ready to be written and fingerprinted as they are
+    try:
+        with pdfplumber.open(pdf_path) as pdf:
+            # Probe page 1 first: a scanned PDF has no text objects there at all,
+            # so skip parsing the remaining pages and go to OCR. A short but real
+            # first page still falls through to the rest of the document
+            first_page = pdf.pages[0]
+            if not first_page.chars:
+                return b""
+            buf = bytearray((first_page.extract_text() or '').encode('utf-8'))
+            for page in pdf.pages[1:]:
+                page_text = page.extract_text()
+                if page_text:
+                    buf += page_text.encode('utf-8')
+            text = bytes(buf).strip()
+            if len(text) >= 30:
+                return text
+    except Exception:
+        pass
+    return b""
+
+def render_pages(pdf_path, poppler_path, out_dir, raster_threads=1):
+    # 200 dpi is enough for Tesseract on invoice text and rasterizes far fewer pixels than 300.
+    # Pages are written to out_dir so only their paths travel to the OCR workers
+    return convert_from_path(pdf_path, dpi=200, poppler_path=poppler_path,
+                             thread_count=raster_threads, output_folder=out_dir,
+                             fmt='tiff', paths_only=True)
+
+def ocr_page_files(image_paths, tesseract_path):
+    # A single tesseract process reads every page from a list-of-images file
+    # instead of paying engine start-up once per page
+    try:
+        list_path = os.path.join(os.path.dirname(image_paths[0]), "list.txt")
+        with open(list_path, 'w', encoding='utf-8') as file:
+            file.write('\n'.join(image_paths) + '\n')
+        result = subprocess.run([tesseract_path, list_path, "stdout", "-l", "eng"],
+                                capture_output=True, check=True,
+                                creationflags=getattr(subprocess, "CREATE_NO_WINDOW", 0))
+        # Tesseract prints UTF-8 and separates pages with a form feed; stay in bytes
+        text = b''.join(t.strip() for t in result.stdout.split(b'\f'))
+        if len(text) >= 30:
+            return text
+    except Exception:
+        pass
+    return b""
+
+def write_bytes(path, data):
+    # Raw fd write of already-encoded text: no text-mode wrapper or second
+    # encode, and no fsync, the OS flushes in its own time
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0), 0o644)
+    try:
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view):]
+    finally:
+        os.close(fd)
+
+def fast_move(src, dst):
+    # One rename on the same volume (overwrites like shutil.move does);
+    # shutil.move copies and deletes when the repository is on another drive
+    try:
+        os.replace(src, dst)
+    except OSError:
+        shutil.move(src, dst)
+
+FICLONE = 0x40049409  # Linux ioctl: share the source's extents (btrfs, XFS)
+
+def fast_copy(src, dst):
+    # Replace an existing target, as copy2 would, by unlinking it: writing
+    # into it could go through a hard link back to the source file
+    if os.path.lexists(dst):
+        os.remove(dst)
+    # Hard link first: metadata only and keeps mtime on the same volume
+    # (os.link is CreateHardLinkW on Windows)
+    try:
+        os.link(src, dst)
+        return
+    except OSError:
+        pass
+    # Reflink on copy-on-write filesystems, then a real copy as the last resort
+    if fcntl is not None:
+        try:
+            with open(src, 'rb') as s, open(dst, 'wb') as d:
+                fcntl.ioctl(d.fileno(), FICLONE, s.fileno())
+            # The tables show modification times, so keep them
+            shutil.copystat(src, dst)
+            return
+        except OSError:
+            pass
+    shutil.copy2(src, dst)
+
+def list_files_with_ext(folder, ext):
+    # DirEntry.is_file() comes from the directory read, no extra stat per entry
+    with os.scandir(folder) as it:
+        return [e.name for e in it if e.is_file() and e.name.lower().endswith(ext)]
 
 class InvoicePipeline:
     def __init__(self, base_folder, poppler_path, tesseract_path, gui_logger, stop_event):
@@ -108,11 +267,15 @@ class InvoicePipeline:
         self.EXCEPTION_FOLDER = os.path.join(self.BASE_FOLDER, "Exception_Folder")
         self.UNIQUE_INVOICES_FOLDER = os.path.join(self.BASE_FOLDER, "Unique_Invoices_Folder")
         self.DUPLICATES_INVOICES_FOLDER = os.path.join(self.BASE_FOLDER, "Duplicates_Invoices_Folder")
+        # Persisted repository hashes, so each run only hashes new or modified repo files
+        self.REPO_INDEX = os.path.join(self.BASE_FOLDER, "repo_index.sqlite")
         self.POPPLER_PATH = poppler_path
         self.TESSERACT_PATH = tesseract_path
-        pytesseract.pytesseract.tesseract_cmd = self.TESSERACT_PATH
         self.log = gui_logger.log
         self.stop_event = stop_event
+        # Text filename -> content hash, filled while extracted text is written
+        # so later stages do not have to re-read and re-hash the files
+        self._extracted_hashes = {}
 
     def ensure_folders(self):
         os.makedirs(self.BASE_FOLDER, exist_ok=True)
@@ -129,11 +292,13 @@ class InvoicePipeline:
         pdf_count = 0
         other_count = 0
         try:
-            has_subfolders = any(os.path.isdir(os.path.join(source_folder, d)) for d in os.listdir(source_folder))
+            with os.scandir(source_folder) as it:
+                entries = list(it)
+            has_subfolders = any(e.is_dir() for e in entries)
             def process_file(src_path, filename):
                 nonlocal pdf_count, other_count
                 dst_folder = self.MAIN_PDF_FOLDER if filename.lower().endswith('.pdf') else self.EXCEPTION_FOLDER
-                shutil.copy2(src_path, os.path.join(dst_folder, filename))
+                fast_copy(src_path, os.path.join(dst_folder, filename))
                 if dst_folder == self.MAIN_PDF_FOLDER:
                     pdf_count += 1
                 else:
@@ -147,87 +312,225 @@ class InvoicePipeline:
                         full_path = os.path.join(root, f)
                         process_file(full_path, f)
             else:
-                for f in os.listdir(source_folder):
+                for e in entries:
                     if self.stop_event.is_set(): break
-                    full_path = os.path.join(source_folder, f)
-                    if os.path.isfile(full_path):
-                        process_file(full_path, f)
+                    if e.is_file():
+                        process_file(e.path, e.name)
             self.log(f"✅ {pdf_count} PDFs copied to {self.MAIN_PDF_FOLDER}")
             self.log(f"📦 {other_count} non-PDF files moved to {self.EXCEPTION_FOLDER}")
         except Exception as e:
             self.log(f"❌ Error copying files: {e}")
 
-    def extract_text_from_pdf(self, pdf_path):
-        if self.stop_event.is_set(): return "", None
-        try:
-            with pdfplumber.open(pdf_path) as pdf:
-                text = ''.join(page.extract_text() or '' for page in pdf.pages).strip()
-                if len(text) >= 30:
-                    return text, "pdfplumber"
-        except Exception:
-            pass
+    def _plan_extraction_workers(self, pdf_count):
+        # One pool worker per core (or per PDF). A single renderer thread feeds
+        # all of them, so its Poppler gets a quarter of the cores, at most 4
+        cpus = os.cpu_count() or 1
+        workers = max(1, min(cpus, pdf_count))
+        raster_threads = max(1, min(4, cpus // 4))
+        return workers, raster_threads
+
+    def _make_extraction_executor(self, workers):
         try:
-            pages = convert_from_path(pdf_path, dpi=300, poppler_path=self.POPPLER_PATH)
-            text = ''.join(pytesseract.image_to_string(p).strip() for p in pages)
-            if len(text) >= 30:
-                return text, "ocr"
-        except Exception:
-            pass
-        return "", None
+            return ProcessPoolExecutor(max_workers=workers, initializer=_init_worker)
+        except (OSError, NotImplementedError) as e:
+            # OCR runs in tesseract subprocesses, so threads still parallelize it
+            self.log(f"⚠️ Process pool unavailable ({e}), extracting with threads")
+            return ThreadPoolExecutor(max_workers=workers, initializer=_init_worker)
+
+    def _save_extraction(self, f, data, method):
+        # Writes the UTF-8 text, or moves the PDF to Exception when nothing usable came out
+        if data:
+            try:
+                txt_path = os.path.join(self.EXTRACTED_TEXT_FOLDER, os.path.splitext(f)[0] + ".txt")
+                write_bytes(txt_path, data)
+                self._extracted_hashes[os.path.basename(txt_path)] = content_fingerprint(data)
+                self.log(f"✅ Extracted text from '{f}' using {method}")
+                return "extracted"
+            except Exception as e:
+                self.log(f"❌ Failed to save text for '{f}': {e}")
+        else:
+            try:
+                fast_move(os.path.join(self.MAIN_PDF_FOLDER, f), os.path.join(self.EXCEPTION_FOLDER, f))
+                self.log(f"🛑 Extraction failed. Moved '{f}' to Exception folder")
+                return "exception"
+            except Exception as e:
+                self.log(f"❌ Failed to move '{f}' to Exception folder: {e}")
+        return None
+
+    def _put_unless_stopped(self, q, item, abort=None):
+        while not self.stop_event.is_set() and not (abort and abort.is_set()):
+            try:
+                q.put(item, timeout=0.2)
+                return
+            except queue.Full:
+                pass
+
+    def _get_unless_stopped(self, q):
+        while not self.stop_event.is_set():
+            try:
+                return q.get(timeout=0.2)
+            except queue.Empty:
+                pass
+        return None
+
+    def _render_for_ocr(self, pdf_files, tmp_dir, page_q, raster_threads, abort):
+        # Producer: Poppler runs in subprocesses, so this thread rasterizes the
+        # next documents while the pool OCRs the current ones. abort is set when
+        # the consumer bails out, so a put on a full queue never blocks forever
+        for i, f in enumerate(pdf_files):
+            if self.stop_event.is_set() or abort.is_set(): return
+            out_dir = os.path.join(tmp_dir, str(i))
+            try:
+                os.makedirs(out_dir)
+                pages = render_pages(os.path.join(self.MAIN_PDF_FOLDER, f), self.POPPLER_PATH,
+                                     out_dir, raster_threads)
+            except Exception as e:
+                self.log(f"⚠️ Could not rasterize '{f}': {e}")
+                pages = []
+            self._put_unless_stopped(page_q, (f, out_dir, pages), abort)
+        self._put_unless_stopped(page_q, None, abort)
+
+    def _ocr_texts(self, executor, pdf_files, workers, raster_threads, counts, pending):
+        # The bounded queue and the in-flight cap keep rendering only a few
+        # documents ahead of OCR, which also bounds the page images on disk
+        page_q = queue.Queue(maxsize=2 * workers)
+        in_flight = {}
+
+        def collect(future):
+            f, out_dir = in_flight.pop(future)
+            try:
+                text = future.result()
+            except BrokenProcessPool:
+                # Not this PDF's fault: extract_texts retries it on threads
+                raise
+            except Exception as e:
+                self.log(f"❌ OCR worker failed on '{f}': {e}")
+                text = b""
+            shutil.rmtree(out_dir, ignore_errors=True)
+            outcome = self._save_extraction(f, text, "ocr")
+            if outcome: counts[outcome] += 1
+            pending.discard(f)
+
+        abort = threading.Event()
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            producer = threading.Thread(target=self._render_for_ocr,
+                                        args=(pdf_files, tmp_dir, page_q, raster_threads, abort),
+                                        daemon=True)
+            producer.start()
+            try:
+                while True:
+                    if len(in_flight) >= 2 * workers:
+                        done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            collect(future)
+                        continue
+                    item = self._get_unless_stopped(page_q)
+                    if item is None: break
+                    f, out_dir, pages = item
+                    if pages:
+                        in_flight[executor.submit(ocr_page_files, pages, self.TESSERACT_PATH)] = (f, out_dir)
+                    else:
+                        shutil.rmtree(out_dir, ignore_errors=True)
+                        outcome = self._save_extraction(f, b"", "ocr")
+                        if outcome: counts[outcome] += 1
+                        pending.discard(f)
+                for future in as_completed(list(in_flight)):
+                    if self.stop_event.is_set(): break
+                    collect(future)
+            finally:
+                # Nothing may still be reading the page images when the temp dir goes away
+                for future in in_flight:
+                    future.cancel()
+                wait(in_flight)
+                abort.set()
+                producer.join()
+
+    def _extract_with(self, executor, pdf_files, workers, raster_threads, counts, pending):
+        # Stage 1: the text layer, in parallel. Text is written and failures
+        # moved here, in the pipeline thread. Finished PDFs leave pending
+        needs_ocr = []
+        futures = {
+            executor.submit(extract_digital_text, os.path.join(self.MAIN_PDF_FOLDER, f)): f
+            for f in pdf_files
+        }
+        for future in as_completed(futures):
+            if self.stop_event.is_set():
+                for pending_future in futures:
+                    pending_future.cancel()
+                break
+            f = futures[future]
+            try:
+                text = future.result()
+            except BrokenProcessPool:
+                raise
+            except Exception as e:
+                self.log(f"❌ Extraction worker failed on '{f}': {e}")
+                pending.discard(f)
+                continue
+            if text:
+                outcome = self._save_extraction(f, text, "pdfplumber")
+                if outcome: counts[outcome] += 1
+                pending.discard(f)
+            else:
+                needs_ocr.append(f)
+        # Stage 2: scanned PDFs, rendering overlapped with OCR
+        if needs_ocr and not self.stop_event.is_set():
+            self.log(f"🔍 {len(needs_ocr)} PDFs have no text layer, running OCR")
+            self._ocr_texts(executor, needs_ocr, workers, raster_threads, counts, pending)
 
     def extract_texts(self):
         if self.stop_event.is_set(): return
         self.log("Starting text extraction...")
-        count_extracted = 0
-        count_exception = 0
+        counts = {"extracted": 0, "exception": 0}
         start = time.time()
-        for f in os.listdir(self.MAIN_PDF_FOLDER):
-            if self.stop_event.is_set(): break
-            if f.lower().endswith(".pdf"):
-                pdf_path = os.path.join(self.MAIN_PDF_FOLDER, f)
-                text, method = self.extract_text_from_pdf(pdf_path)
-                if text:
-                    try:
-                        txt_path = os.path.join(self.EXTRACTED_TEXT_FOLDER, os.path.splitext(f)[0] + ".txt")
-                        with open(txt_path, 'w', encoding='utf-8') as file:
-                            file.write(text)
-                        count_extracted += 1
-                        self.log(f"✅ Extracted text from '{f}' using {method}")
-                    except Exception as e:
-                        self.log(f"❌ Failed to save text for '{f}': {e}")
-                else:
-                    try:
-                        shutil.move(pdf_path, os.path.join(self.EXCEPTION_FOLDER, f))
-                        count_exception += 1
-                        self.log(f"🛑 Extraction failed. Moved '{f}' to Exception folder")
-                    except Exception as e:
-                        self.log(f"❌ Failed to move '{f}' to Exception folder: {e}")
-        self.log(f"Extraction done. {count_extracted} succeeded, {count_exception} exceptions")
+        pdf_files = list_files_with_ext(self.MAIN_PDF_FOLDER, ".pdf")
+        workers, raster_threads = self._plan_extraction_workers(len(pdf_files))
+        pending = set(pdf_files)
+        try:
+            with self._make_extraction_executor(workers) as executor:
+                self._extract_with(executor, pdf_files, workers, raster_threads, counts, pending)
+        except BrokenProcessPool as e:
+            # A worker failed to start or died: every later submit and result
+            # fails too, so finish the remaining PDFs on threads instead
+            if not self.stop_event.is_set():
+                self.log(f"⚠️ Process pool failed ({e}), extracting the remaining {len(pending)} PDFs with threads")
+                remaining = [f for f in pdf_files if f in pending]
+                with ThreadPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+                    self._extract_with(executor, remaining, workers, raster_threads, counts, pending)
+        self.log(f"Extraction done. {counts['extracted']} succeeded, {counts['exception']} exceptions")
         self.log(f"⏱️ Took {time.time() - start:.2f} seconds")
 
+    def _extracted_hash(self, filename):
+        h = self._extracted_hashes.get(filename)
+        if h is None:
+            # Left over from an earlier run: hash it from disk
+            h = content_fingerprint_file(os.path.join(self.EXTRACTED_TEXT_FOLDER, filename))
+            self._extracted_hashes[filename] = h
+        return h
+
     def deduplicate_text_files(self):
         if self.stop_event.is_set(): return
         self.log("Starting deduplication...")
         start = time.time()
-        files = [f for f in os.listdir(self.EXTRACTED_TEXT_FOLDER) if f.lower().endswith('.txt')]
+        files = list_files_with_ext(self.EXTRACTED_TEXT_FOLDER, '.txt')
         seen_hashes = {}
         removed_count = 0
         for f in files:
             if self.stop_event.is_set(): break
             txt_path = os.path.join(self.EXTRACTED_TEXT_FOLDER, f)
             try:
-                with open(txt_path, 'r', encoding='utf-8') as file:
-                    content = file.read()
-                h = sha256_hash(content)
+                h = self._extracted_hash(f)
                 if h in seen_hashes:
                     os.remove(txt_path)
+                    self._extracted_hashes.pop(f, None)
                     removed_count += 1
                     self.log(f"🗑️ Removed duplicate text file '{f}' (duplicate of '{seen_hashes[h]}')")
                     pdf_name = os.path.splitext(f)[0] + ".pdf"
                     pdf_path = os.path.join(self.MAIN_PDF_FOLDER, pdf_name)
                     dst_path = os.path.join(self.DUPLICATES_INVOICES_FOLDER, pdf_name)
                     if os.path.exists(pdf_path):
-                        shutil.move(pdf_path, dst_path)
+                        fast_move(pdf_path, dst_path)
                         self.log(f"📁 Moved corresponding duplicate PDF '{pdf_name}' to Duplicates folder")
                 else:
                     seen_hashes[h] = f
@@ -236,52 +539,110 @@ class InvoicePipeline:
         self.log(f"Deduplication done. Removed {removed_count} duplicates.")
         self.log(f"⏱️ Took {time.time() - start:.2f} seconds")
 
+    def _open_repo_index(self):
+        db = sqlite3.connect(self.REPO_INDEX)
+        db.execute("CREATE TABLE IF NOT EXISTS repo_index (path TEXT PRIMARY KEY, mtime REAL, sha BLOB, size INTEGER)")
+        if "size" not in {col[1] for col in db.execute("PRAGMA table_info(repo_index)")}:
+            # Index from before sizes were stored: old rows get NULL and are rehashed once
+            db.execute("ALTER TABLE repo_index ADD COLUMN size INTEGER")
+        db.execute("CREATE TABLE IF NOT EXISTS repo_meta (key TEXT PRIMARY KEY, value TEXT)")
+        row = db.execute("SELECT value FROM repo_meta WHERE key = 'fingerprint'").fetchone()
+        fingerprint = f"{FINGERPRINT_NAME}:{_DEL.hex()}"
+        if row is None or row[0] != fingerprint:
+            # Digests from another fingerprint function or whitespace set never match: rebuild the index
+            with db:
+                db.execute("DELETE FROM repo_index")
+                db.execute("INSERT OR REPLACE INTO repo_meta VALUES ('fingerprint', ?)", (fingerprint,))
+        return db
+
+    def _load_repo_hashes(self, repository_folder):
+        repo_hashes = set()
+        new_rows = []
+        stale = []
+        present = set()
+        db = self._open_repo_index()
+        try:
+            indexed = {path: (mtime, size, sha)
+                       for path, mtime, size, sha in db.execute("SELECT path, mtime, size, sha FROM repo_index")}
+            with os.scandir(repository_folder) as it:
+                for entry in it:
+                    if self.stop_event.is_set(): break
+                    if entry.is_file() and entry.name.lower().endswith(".txt"):
+                        repo_path = os.path.abspath(entry.path)
+                        try:
+                            st = entry.stat()
+                            row = indexed.get(repo_path)
+                            # Size as well as mtime: catches rewrites within the
+                            # filesystem's mtime resolution
+                            if row and row[0] == st.st_mtime and row[1] == st.st_size:
+                                repo_hashes.add(row[2])
+                            else:
+                                stale.append((entry.name, repo_path, st.st_mtime, st.st_size))
+                            present.add(repo_path)
+                        except Exception as e:
+                            self.log(f"❌ Could not read repo file '{entry.name}': {e}")
+            # File reads and the hash update release the GIL, so threads overlap them
+            with ThreadPoolExecutor(max_workers=min(8, os.cpu_count() or 1)) as pool:
+                futures = {pool.submit(content_fingerprint_file, repo_path): (name, repo_path, mtime, size)
+                           for name, repo_path, mtime, size in stale}
+                for future in as_completed(futures):
+                    name, repo_path, mtime, size = futures[future]
+                    try:
+                        sha = future.result()
+                    except Exception as e:
+                        self.log(f"❌ Could not read repo file '{name}': {e}")
+                        present.discard(repo_path)
+                        continue
+                    new_rows.append((repo_path, mtime, sha, size))
+                    repo_hashes.add(sha)
+            with db:
+                db.executemany("INSERT OR REPLACE INTO repo_index (path, mtime, sha, size) VALUES (?, ?, ?, ?)", new_rows)
+                if not self.stop_event.is_set():
+                    # Forget files that were removed from this repository folder
+                    folder = os.path.abspath(repository_folder)
+                    gone = [(path,) for path in indexed if os.path.dirname(path) == folder and path not in present]
+                    db.executemany("DELETE FROM repo_index WHERE path = ?", gone)
+        finally:
+            db.close()
+        self.log(f"♻️ Repository index: {len(present) - len(new_rows)} cached, {len(new_rows)} new or modified files hashed")
+        return repo_hashes
+
     def cross_compare_with_repository(self, repository_folder):
         if self.stop_event.is_set(): return
         self.log(f"Cross-comparing with repository: {repository_folder}")
         start = time.time()
-        repo_hashes = set()
-        for f in os.listdir(repository_folder):
-            if self.stop_event.is_set(): break
-            if f.lower().endswith(".txt"):
-                try:
-                    with open(os.path.join(repository_folder, f), 'r', encoding='utf-8') as file:
-                        repo_hashes.add(sha256_hash(file.read()))
-                except Exception as e:
-                    self.log(f"❌ Could not read repo file '{f}': {e}")
-        extracted_files = [f for f in os.listdir(self.EXTRACTED_TEXT_FOLDER) if f.lower().endswith('.txt')]
+        repo_hashes = self._load_repo_hashes(repository_folder)
+        extracted_files = list_files_with_ext(self.EXTRACTED_TEXT_FOLDER, '.txt')
         count_unique = 0
         count_duplicates = 0
         for f in extracted_files:
             if self.stop_event.is_set(): break
             txt_path = os.path.join(self.EXTRACTED_TEXT_FOLDER, f)
             try:
-                with open(txt_path, 'r', encoding='utf-8') as file:
-                    content = file.read()
-                h = sha256_hash(content)
+                h = self._extracted_hash(f)
                 pdf_name = os.path.splitext(f)[0] + ".pdf"
                 pdf_path = os.path.join(self.MAIN_PDF_FOLDER, pdf_name)
                 if h in repo_hashes:
                     if os.path.exists(pdf_path):
-                        shutil.move(pdf_path, os.path.join(self.DUPLICATES_INVOICES_FOLDER, pdf_name))
+                        fast_move(pdf_path, os.path.join(self.DUPLICATES_INVOICES_FOLDER, pdf_name))
                     os.remove(txt_path)
+                    self._extracted_hashes.pop(f, None)
                     count_duplicates += 1
                     self.log(f"🗂️ Moved duplicate PDF '{pdf_name}' to Duplicates and deleted text")
                 else:
                     if os.path.exists(pdf_path):
-                        shutil.move(pdf_path, os.path.join(self.UNIQUE_INVOICES_FOLDER, pdf_name))
+                        fast_move(pdf_path, os.path.join(self.UNIQUE_INVOICES_FOLDER, pdf_name))
                         count_unique += 1
                         self.log(f"✅ Moved unique PDF '{pdf_name}' to Unique folder")
             except Exception as e:
                 self.log(f"❌ Error comparing file '{f}': {e}")
-        for f in os.listdir(self.EXCEPTION_FOLDER):
+        for f in list_files_with_ext(self.EXCEPTION_FOLDER, '.pdf'):
             if self.stop_event.is_set(): break
-            if f.lower().endswith('.pdf'):
-                try:
-                    shutil.copy2(os.path.join(self.EXCEPTION_FOLDER, f), os.path.join(self.UNIQUE_INVOICES_FOLDER, f))
-                    self.log(f"📋 Copied exception PDF '{f}' to Unique folder for inspection")
-                except Exception as e:
-                    self.log(f"❌ Could not copy exception PDF '{f}': {e}")
+            try:
+                fast_copy(os.path.join(self.EXCEPTION_FOLDER, f), os.path.join(self.UNIQUE_INVOICES_FOLDER, f))
+                self.log(f"📋 Copied exception PDF '{f}' to Unique folder for inspection")
+            except Exception as e:
+                self.log(f"❌ Could not copy exception PDF '{f}': {e}")
         self.log(f"Cross-comparison complete. Unique: {count_unique}, Duplicates: {count_duplicates}")
         self.log(f"⏱️ Took {time.time() - start:.2f} seconds")
 
@@ -294,29 +655,50 @@ class InvoicePipeline:
         time_str = now.strftime("%H%M%S")
         month_year_str = now.strftime("%b_%y")
         moved_count = 0
-        for f in os.listdir(self.EXTRACTED_TEXT_FOLDER):
+        index_rows = []
+        # Every file in this run shares the timestamped stem; free names are
+        # found against one directory listing instead of a stat per attempt.
+        # Lowercased because Windows filenames are case-insensitive
+        stem = f"INVC_{date_str}_{time_str}_{month_year_str}"
+        with os.scandir(repository_folder) as it:
+            existing = {e.name.lower() for e in it}
+        count = 0
+        for f in list_files_with_ext(self.EXTRACTED_TEXT_FOLDER, ".txt"):
             if self.stop_event.is_set(): break
-            if f.lower().endswith(".txt"):
-                src_txt_path = os.path.join(self.EXTRACTED_TEXT_FOLDER, f)
-                base_name = f"INVC_{date_str}_{time_str}_{month_year_str}.txt"
-                new_name = base_name
-                count = 1
-                while os.path.exists(os.path.join(repository_folder, new_name)):
-                    new_name = base_name.replace(".txt", f"_{count}.txt")
-                    count += 1
-                dst_txt_path = os.path.join(repository_folder, new_name)
-                try:
-                    shutil.move(src_txt_path, dst_txt_path)
-                    self.log(f"✅ Moved and renamed '{f}' to '{new_name}'")
-                    moved_count += 1
-                except Exception as e:
-                    self.log(f"❌ Failed to move and rename '{f}': {e}")
+            src_txt_path = os.path.join(self.EXTRACTED_TEXT_FOLDER, f)
+            new_name = f"{stem}.txt"
+            # count carries over, so the n-th file does not re-probe n taken suffixes
+            while new_name.lower() in existing:
+                count += 1
+                new_name = f"{stem}_{count}.txt"
+            existing.add(new_name.lower())
+            dst_txt_path = os.path.join(repository_folder, new_name)
+            try:
+                sha = self._extracted_hash(f)
+                fast_move(src_txt_path, dst_txt_path)
+                self._extracted_hashes.pop(f, None)
+                self.log(f"✅ Moved and renamed '{f}' to '{new_name}'")
+                moved_count += 1
+                dst_abs = os.path.abspath(dst_txt_path)
+                st = os.stat(dst_abs)
+                index_rows.append((dst_abs, st.st_mtime, sha, st.st_size))
+            except Exception as e:
+                self.log(f"❌ Failed to move and rename '{f}': {e}")
+        try:
+            db = self._open_repo_index()
+            try:
+                with db:
+                    db.executemany("INSERT OR REPLACE INTO repo_index (path, mtime, sha, size) VALUES (?, ?, ?, ?)", index_rows)
+            finally:
+                db.close()
+        except Exception as e:
+            self.log(f"❌ Could not update repository index: {e}")
         self.log(f"✅ Moved and renamed {moved_count} unique text files to repository")
         self.log(f"⏱️ Took {time.time() - start:.2f} seconds")
 
     def cleanup_main_pdf_folder(self):
         if self.stop_event.is_set(): return
-        leftover_files = [f for f in os.listdir(self.MAIN_PDF_FOLDER) if f.lower().endswith(".pdf")]
+        leftover_files = list_files_with_ext(self.MAIN_PDF_FOLDER, ".pdf")
         if not leftover_files:
             self.log("✅ No leftover PDFs in MAIN_PDF_FOLDER")
             return
@@ -324,25 +706,29 @@ class InvoicePipeline:
         for f in leftover_files:
             if self.stop_event.is_set(): break
             try:
-                shutil.move(os.path.join(self.MAIN_PDF_FOLDER, f), os.path.join(self.EXCEPTION_FOLDER, f))
+                fast_move(os.path.join(self.MAIN_PDF_FOLDER, f), os.path.join(self.EXCEPTION_FOLDER, f))
                 self.log(f"📦 Moved leftover PDF '{f}' to Exception folder")
             except Exception as e:
                 self.log(f"❌ Failed to move leftover PDF '{f}': {e}")
 
     def list_files_as_dataframe(self, folder_path):
-        files = []
         if not os.path.exists(folder_path):
-            return pd.DataFrame(files)
-        for f in os.listdir(folder_path):
-            full_path = os.path.join(folder_path, f)
-            if os.path.isfile(full_path):
-                info = os.stat(full_path)
-                files.append({
-                    "Filename": f,
-                    "Size_Bytes": info.st_size,
-                    "Modified_Time": time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(info.st_mtime))
-                })
-        df = pd.DataFrame(files)
+            return pd.DataFrame()
+        # Columnar build; Modified_Time stays datetime64 and is formatted only for display
+        names, sizes, mtimes = [], [], []
+        with os.scandir(folder_path) as it:
+            for e in it:
+                if e.is_file():
+                    info = e.stat()
+                    names.append(e.name)
+                    sizes.append(info.st_size)
+                    mtimes.append(info.st_mtime)
+        modified = np.array([datetime.fromtimestamp(int(t)) for t in mtimes], dtype="datetime64[s]")
+        df = pd.DataFrame({
+            "Filename": names,
+            "Size_Bytes": np.asarray(sizes, dtype=np.int64),
+            "Modified_Time": modified,
+        })
         return df
 
     def get_duplicate_invoices_dataframe(self):
@@ -473,6 +859,7 @@ class InvoiceApp(QMainWindow):
         self.unique_table.setColumnCount(3)
         self.unique_table.setHorizontalHeaderLabels(["Filename", "Size (Bytes)", "Modified Time"])
         self.unique_table.horizontalHeader().setStretchLastSection(True)
+        self._set_column_widths(self.unique_table)
         unique_layout.addWidget(self.unique_table)
         
         self.export_unique_btn = QPushButton("Export Unique CSV")
@@ -489,6 +876,7 @@ class InvoiceApp(QMainWindow):
         self.dup_table.setColumnCount(3)
         self.dup_table.setHorizontalHeaderLabels(["Filename", "Size (Bytes)", "Modified Time"])
         self.dup_table.horizontalHeader().setStretchLastSection(True)
+        self._set_column_widths(self.dup_table)
         dup_layout.addWidget(self.dup_table)
         
         self.export_dup_btn = QPushButton("Export Duplicates CSV")
@@ -615,19 +1003,35 @@ class InvoiceApp(QMainWindow):
             df = self.pipeline.get_duplicate_invoices_dataframe()
         self._populate_table(self.dup_table, df)
 
+    def _set_column_widths(self, table: QTableWidget):
+        # Fixed widths instead of resizeColumnsToContents(), which measures every cell
+        table.setColumnWidth(0, 360)
+        table.setColumnWidth(1, 110)
+
     def _populate_table(self, table: QTableWidget, df: pd.DataFrame):
         table.setRowCount(0)
         if df is None or df.empty:
             return
         
-        table.setRowCount(len(df))
-        for i, row in df.iterrows():
-            table.setItem(i, 0, QTableWidgetItem(str(row.get('Filename', ''))))
-            table.setItem(i, 1, QTableWidgetItem(str(row.get('Size_Bytes', ''))))
-            table.setItem(i, 2, QTableWidgetItem(str(row.get('Modified_Time', ''))))
-        
-        # Auto-resize columns to content
-        table.resizeColumnsToContents()
+        names = df['Filename'].tolist()
+        sizes = df['Size_Bytes'].astype(str).tolist()
+        mtimes = df['Modified_Time'].dt.strftime('%Y-%m-%d %H:%M:%S').tolist()
+
+        # Fill with repaint, signals and sorting suspended, then refresh once
+        sorting = table.isSortingEnabled()
+        table.setSortingEnabled(False)
+        table.setUpdatesEnabled(False)
+        table.blockSignals(True)
+        try:
+            table.setRowCount(len(names))
+            for i, (fn, sz, mt) in enumerate(zip(names, sizes, mtimes)):
+                table.setItem(i, 0, QTableWidgetItem(fn))
+                table.setItem(i, 1, QTableWidgetItem(sz))
+                table.setItem(i, 2, QTableWidgetItem(mt))
+        finally:
+            table.blockSignals(False)
+            table.setUpdatesEnabled(True)
+            table.setSortingEnabled(sorting)
 
     def export_unique_csv(self):
         if not self.pipeline:
@@ -683,6 +1087,8 @@ class InvoiceApp(QMainWindow):
 
 # ----------------- Run Application -----------------
 def main():
+    # Needed for the extraction process pool in frozen Windows builds
+    multiprocessing.freeze_support()
     app = QApplication(sys.argv)
     
     # Optional: Set application style